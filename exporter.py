@@ -1,12 +1,55 @@
+import av
 import cv2
 import pygame
 import sys
 import os
 import csv
 import argparse
-import tkinter as tk
-from tkinter import filedialog
-import glob
+import time
+import concurrent.futures
+import collections
+import threading
+import bisect
+import itertools
+
+# Exports run here so JPEG encoding and CSV writes don't stall the UI loop
+executor = concurrent.futures.ThreadPoolExecutor(max_workers=2)
+# Hidden Tk root reused by select_output_folder
+tk_root = None
+
+try:
+    from av.codec.hwaccel import HWAccel, hwdevices_available
+except ImportError:
+    # PyAV < 14 has no hardware decoding support
+    HWAccel = None
+
+try:
+    from turbojpeg import TurboJPEG, TJSAMP_420
+except ImportError:
+    TurboJPEG = None
+
+VIDEO_EXTS = {'.mp4', '.mov', '.mkv', '.avi', '.webm', '.m4v'}
+# Seconds without navigation input before a keyframe preview is refined to the exact frame
+SCRUB_SETTLE_S = 0.1
+# Without a keyframe index, forward jumps shorter than this decode on from the current position instead of seeking
+SEQUENTIAL_DECODE_LIMIT = 30
+# Keyframe previews are skipped when the target is only this many frames ahead of the decoder
+PREVIEW_DECODE_LIMIT = 4
+# Frames decoded ahead into the cache during playback, so the next frame is ready when it is due
+PLAYBACK_PREFETCH = 2
+# Rendered overlay labels kept around, mostly 'Frame: N' counters
+LABEL_CACHE_SIZE = 256
+# Loop rate while nothing is playing, decoding or being exported
+IDLE_FPS = 60
+# Memory for decoded frames kept for stepping back and forth, ~32 frames at 1080p and 8 at 4K
+FRAME_CACHE_BYTES = 192 * 1024 * 1024
+# Floor on cached frames for very large videos, playback prefetch and stepping back need a few
+MIN_FRAME_CACHE = 4
+# Hardware decoders in order of preference, the first one the loaded FFmpeg supports is tried
+HWACCEL_DEVICE_TYPES = ('videotoolbox', 'd3d11va', 'vaapi', 'cuda')
+JPEG_QUALITY = 90
+# Huffman optimization and progressive scans cost encode time for little size gain at this quality
+JPEG_PARAMS = [int(cv2.IMWRITE_JPEG_QUALITY), JPEG_QUALITY, int(cv2.IMWRITE_JPEG_OPTIMIZE), 0, int(cv2.IMWRITE_JPEG_PROGRESSIVE), 0]
 
 def parse_arguments():
     parser = argparse.ArgumentParser(description='Video Frame Exporter.')
@@ -35,133 +78,512 @@ def print_usage():
     - Press 'SPACE' to pause and unpause the video.
     """)
 
+def open_container(path, hwaccel=True):
+    # Decode on the platform's fixed-function decoder when there is one, frames
+    # are still downloaded to system memory. Falls back to software decoding
+    # when no device is available or it can't be opened.
+    if hwaccel and HWAccel is not None:
+        available = hwdevices_available()
+        device_type = next((d for d in HWACCEL_DEVICE_TYPES if d in available), None)
+        if device_type is not None:
+            try:
+                return av.open(path, hwaccel=HWAccel(device_type=device_type, allow_software_fallback=True))
+            except av.error.FFmpegError:
+                pass
+    return av.open(path)
+
+class PyAVSource:
+    # Holds one demuxer/decoder open for the lifetime of the video so seeks
+    # don't pay the container init cost every time a frame is requested.
+    def __init__(self, path, cache_bytes=FRAME_CACHE_BYTES, hwaccel=True):
+        self.container = open_container(path, hwaccel)
+        self.stream = self.container.streams.video[0]
+        self.width = self.stream.codec_context.width
+        self.height = self.stream.codec_context.height
+        self.start_pts = self.stream.start_time or 0
+        self.time_base = float(self.stream.time_base)
+        self.pos_msec = 0.0
+        self._decoder = None
+        self._next_frame = 0
+        self._cache = collections.OrderedDict()
+        # Bounded by bytes rather than frames, a 4K frame takes four times the memory of a 1080p one
+        self.cache_size = max(MIN_FRAME_CACHE, cache_bytes // (self.width * self.height * 3))
+        self._pinned = {}
+        # Held by whoever drives the decoder, the UI loop and export jobs share one container
+        self.container_lock = threading.RLock()
+        self.keyframes, self.keyframe_dts, self.frame_count = self._index_keyframes()
+
+    def _index_keyframes(self):
+        # One demux pass over the packets, no decoding, to learn where every GOP starts. Counting
+        # the packets also gives the frame count, which neither stream.frames nor the container
+        # duration reliably do for mkv, webm or raw streams
+        keyframes, frame_count = [], 0
+        for packet in self.container.demux(self.stream):
+            # The demuxer ends with an empty flush packet
+            if packet.size == 0:
+                continue
+            frame_count += 1
+            if packet.is_keyframe and packet.pts is not None:
+                # Seeks go by the keyframe's dts, the first packet of some mkv files only has a pts
+                keyframes.append((self.pts_to_frame(packet.pts), packet.pts if packet.dts is None else packet.dts))
+        keyframes.sort()
+        return [frame_idx for frame_idx, _ in keyframes], [dts for _, dts in keyframes], frame_count
+
+    def keyframe_before(self, frame_idx):
+        i = bisect.bisect_right(self.keyframes, frame_idx)
+        return self.keyframes[i - 1] if i else 0
+
+    def frame_to_pts(self, frame_idx):
+        return int(frame_idx / self.stream.average_rate / self.stream.time_base) + self.start_pts
+
+    def pts_to_frame(self, pts):
+        return round((pts - self.start_pts) * self.stream.time_base * self.stream.average_rate)
+
+    def tell(self):
+        return self._next_frame
+
+    def seek(self, frame_idx):
+        # Lands on the keyframe before frame_idx, later reads at or after frame_idx decode on from there
+        with self.container_lock:
+            self._decoder = self._seek(frame_idx)
+
+    def pin(self, frame_indices):
+        # Marked frames are kept out of LRU eviction so exporting them needs no decode.
+        # Single dict lookups and a rebind, no container_lock so the UI never waits on a decode.
+        pinned = {}
+        for frame_idx in frame_indices:
+            entry = self._pinned.get(frame_idx) or self._cache.get(frame_idx)
+            if entry is not None:
+                pinned[frame_idx] = entry
+        self._pinned = pinned
+
+    def drop_cache(self):
+        # Frees the decoded frames once the UI is done with the video, a background export
+        # decodes whatever it still needs. Rebinds like pin, readers hold on to the old dicts.
+        self._pinned = {}
+        self._cache = collections.OrderedDict()
+
+    def read(self, frame_idx, exact=True):
+        with self.container_lock:
+            return self._read(frame_idx, exact)
+
+    def _read(self, frame_idx, exact):
+        # exact=False stops at the keyframe the seek lands on, which is cheap
+        # enough to keep up with wheel scrolling. Short forward steps keep
+        # pulling from the running decoder, skipped frames are never converted.
+        pinned = self._pinned.get(frame_idx)
+        if pinned is not None:
+            img, self.pos_msec = pinned
+            return True, img
+        cache = self._cache
+        if frame_idx in cache:
+            # Redraws, wheel ticks and steps back over recently shown frames skip the decoder entirely
+            cache.move_to_end(frame_idx)
+            img, self.pos_msec = cache[frame_idx]
+            return True, img
+        if not exact and self._decoder is not None and 0 <= frame_idx - self._next_frame < PREVIEW_DECODE_LIMIT:
+            # A wheel tick onto the next few frames decodes them exactly for less than a keyframe seek
+            exact = True
+        target_pts = self.frame_to_pts(frame_idx)
+        ahead = frame_idx - self._next_frame
+        if self.keyframes:
+            # Decoding on is never slower than seeking while no keyframe lies between the decoder and the target
+            sequential = ahead >= 0 and self.keyframe_before(frame_idx) <= self._next_frame
+        else:
+            sequential = 0 <= ahead < SEQUENTIAL_DECODE_LIMIT
+        sequential = sequential and exact and self._decoder is not None
+        # Stepping back re-decodes the GOP up to the target, keep the frames just before it so
+        # the following backward ticks are cache hits instead of another seek each
+        backfill = self.cache_size // 2 if exact and self._decoder is not None and ahead < 0 else 0
+        if not sequential:
+            self._decoder = self._seek(frame_idx)
+        for frame in self._decoder:
+            if frame.pts is None:
+                continue
+            if not exact or frame.pts >= target_pts:
+                self._next_frame = self.pts_to_frame(frame.pts) + 1
+                img, self.pos_msec = self._convert(frame)
+                if exact:
+                    self._remember(frame_idx, img, self.pos_msec)
+                return True, img
+            if backfill and frame_idx - self.pts_to_frame(frame.pts) <= backfill:
+                self._remember(self.pts_to_frame(frame.pts), *self._convert(frame))
+        self._decoder = None
+        return False, None
+
+    def _seek(self, frame_idx):
+        # Seeks to the indexed dts of the keyframe before frame_idx, demuxers such as mpegts
+        # seek by dts and land a GOP late when given a pts. container.seek can still land past
+        # the target on some files (edit lists, sparse indexes), decoding on from there would
+        # silently return a later frame than asked for. Step back one indexed keyframe at a
+        # time until decoding starts at or before it, and finally decode from the very start.
+        target_pts = self.frame_to_pts(frame_idx)
+        if self.keyframes:
+            # Indexed keyframes at or before the target, nearest first
+            i = bisect.bisect_right(self.keyframes, frame_idx)
+            seek_points = self.keyframe_dts[i - 1::-1] if i else []
+        else:
+            seek_points = [target_pts]
+
+        for seek_pts in seek_points:
+            self.container.seek(seek_pts, stream=self.stream)
+            decoder = self.container.decode(self.stream)
+            first = next((frame for frame in decoder if frame.pts is not None), None)
+            if first is not None and first.pts <= target_pts:
+                # Where the decoder really is, previews and backfill go by this rather than the target
+                self._next_frame = self.pts_to_frame(first.pts)
+                return itertools.chain([first], decoder)
+        self.container.seek(0)
+        self._next_frame = 0
+        return self.container.decode(self.stream)
+
+    def _convert(self, frame):
+        img = frame.to_ndarray(format='bgr24')
+        if not img.flags.c_contiguous:
+            # Padded rows (odd widths), pygame.image.frombuffer needs packed pixels
+            img = img.copy()
+        # The frame's own pts is exact on VFR content, measured from the stream start like CAP_PROP_POS_MSEC was
+        return img, (frame.pts - self.start_pts) * self.time_base * 1000
+
+    def _remember(self, frame_idx, img, pos_msec):
+        cache = self._cache
+        cache[frame_idx] = (img, pos_msec)
+        cache.move_to_end(frame_idx)
+        if len(cache) > self.cache_size:
+            cache.popitem(last=False)
+
+    def release(self):
+        with self.container_lock:
+            self.container.close()
+
+class DecodeWorker:
+    # Decodes on its own thread so the UI loop never waits on the decoder. Only
+    # the newest request is kept, frames the user already scrolled past are dropped.
+    def __init__(self, source):
+        self.source = source
+        self._cond = threading.Condition()
+        self._request_idx = None
+        self._latest_frame = None
+        self._running = True
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def request(self, frame_idx, exact=True, prefetch=0):
+        with self._cond:
+            self._request_idx = (frame_idx, exact, prefetch)
+            self._cond.notify_all()
+
+    def latest(self):
+        # Returns (frame_idx, exact, img) once per newly decoded frame, otherwise None
+        with self._cond:
+            latest_frame, self._latest_frame = self._latest_frame, None
+            return latest_frame
+
+    def wait(self, timeout):
+        # Sleeps until the next frame is published, or for timeout seconds
+        with self._cond:
+            if self._latest_frame is None:
+                self._cond.wait(timeout)
+
+    def stop(self):
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+        self._thread.join()
+
+    def _run(self):
+        # Frames still to decode into the source cache, dropped as soon as a new request comes in
+        ahead = []
+        while True:
+            with self._cond:
+                while self._running and self._request_idx is None and not ahead:
+                    self._cond.wait()
+                if not self._running:
+                    return
+                request, self._request_idx = self._request_idx, None
+            if request is None:
+                self.source.read(ahead.pop(0))
+                continue
+            frame_idx, exact, prefetch = request
+            success, img = self.source.read(frame_idx, exact)
+            if success:
+                with self._cond:
+                    self._latest_frame = (frame_idx, exact, img)
+                    self._cond.notify_all()
+            ahead = list(range(frame_idx + 1, min(frame_idx + 1 + prefetch, self.source.frame_count)))
+
+class TextOverlay:
+    # Labels are blitted over the frame, the decoded image itself is never drawn on.
+    # Each distinct text is rendered once; the LRU bound keeps frame counter labels
+    # from piling up during playback while scrubbing back and forth still hits.
+    def __init__(self, height, cache_size=LABEL_CACHE_SIZE):
+        pygame.font.init()
+        # Labels are drawn in frame pixels and scaled with the frame, so size them to the
+        # frame height to keep them about the same size in the window at any resolution
+        size = max(16, height // 36)
+        self.font = pygame.font.SysFont('monospace', size, bold=True)
+        self.margin = size // 3
+        self.line_height = self.font.get_linesize()
+        self._text_surfs = collections.OrderedDict()
+        self.cache_size = cache_size
+        # Strip of the frame covered by the five label lines, redrawn on its own when only the labels change
+        self.band_height = self.position(5)[1]
+
+    def position(self, line):
+        # Top left corner of the given label line
+        return (self.margin, self.margin + line * self.line_height)
+
+    def render(self, text, color=(255, 255, 255)):
+        key = (text, color)
+        if key in self._text_surfs:
+            self._text_surfs.move_to_end(key)
+            return self._text_surfs[key]
+        surf = self._text_surfs[key] = self.font.render(text, True, color)
+        if len(self._text_surfs) > self.cache_size:
+            self._text_surfs.popitem(last=False)
+        return surf
+
 def initialize_video(video_path):
-    cap = cv2.VideoCapture(video_path)
-    if not cap.isOpened():
-        sys.exit("Failed to load video: {video_path}")
-    success, img = cap.read()
-    height, width, _ = img.shape
-    screen = pygame.display.set_mode((width, height), pygame.RESIZABLE)
+    try:
+        source = PyAVSource(video_path)
+    except (av.error.FFmpegError, IndexError):
+        sys.exit(f"Failed to load video: {video_path}")
+    width, height = source.width, source.height
+    screen = pygame.display.set_mode((width, height), pygame.SCALED | pygame.RESIZABLE)
     pygame.display.set_caption("Video Frame Scrubber")
-    frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-    return cap, screen, frame_count, width, height
-
-def save_frames(first_frame, last_frame, video_path, save_folder, accident_occurred):
-    cap = cv2.VideoCapture(video_path)
-    timestamps = []
-    for frame_number in [first_frame, last_frame]:
-        cap.set(cv2.CAP_PROP_POS_FRAMES, frame_number)
-        success, img = cap.read()
-        if success:
-            frame_time_ms = cap.get(cv2.CAP_PROP_POS_MSEC)
-            frame_filename = os.path.join(save_folder, f"frame_{frame_number}.jpg")
-            cv2.imwrite(frame_filename, img)
-            accident_status = "Accident" if accident_occurred else "No Accident"
-            timestamps.append((frame_number, frame_time_ms, accident_status))
-    cap.release()
-    return timestamps
-
-def display_frame_info(img, current_frame, first_frame, last_frame, accident_occurred, height, width, screen):
-    font = cv2.FONT_HERSHEY_SIMPLEX
-    window_size = screen.get_size()
-    resized_img = cv2.resize(img, window_size, interpolation=cv2.INTER_AREA)
-    cv2.putText(resized_img, f'Frame: {current_frame}', (10, 30), font, 1, (255, 255, 255), 2)
+    return source, screen, TextOverlay(height), source.frame_count, width, height
+
+def load_turbojpeg():
+    # PyTurboJPEG is optional, and also needs the libturbojpeg shared library at runtime
+    if TurboJPEG is None:
+        return None
+    try:
+        return TurboJPEG()
+    except (RuntimeError, OSError):
+        return None
+
+def write_jpeg(frame_filename, img, tj=None):
+    if tj is None:
+        # imwrite reports failures through its return value only
+        if not cv2.imwrite(frame_filename, img, JPEG_PARAMS):
+            raise OSError(f"Failed to write {frame_filename}")
+        return
+
+    with open(frame_filename, "wb") as f:
+        f.write(tj.encode(img, quality=JPEG_QUALITY, jpeg_subsample=TJSAMP_420))
+
+def save_frames(source, first_frame, last_frame, save_folder, accident_occurred):
+    timestamps = {}
+    accident_status = "Accident" if accident_occurred else "No Accident"
+    tj = load_turbojpeg()
+    writes = []
+    # Only the decodes hold the container, queued JPEG writes finish without blocking the UI loop
+    with concurrent.futures.ThreadPoolExecutor(max_workers=os.cpu_count()) as pool:
+        with source.container_lock:
+            resume_frame = source.tell()
+            # Decode in ascending order so the later frame is reached by decoding on,
+            # JPEG encoding releases the GIL and overlaps with the next decode
+            for frame_number in sorted((first_frame, last_frame)):
+                if frame_number in timestamps:
+                    continue
+                success, img = source.read(frame_number)
+                if success:
+                    frame_filename = os.path.join(save_folder, f"frame_{frame_number}.jpg")
+                    writes.append(pool.submit(write_jpeg, frame_filename, img, tj))
+                    timestamps[frame_number] = (frame_number, source.pos_msec, accident_status)
+            # Put the decoder back where scrubbing left it, so the next step after an export decodes on instead of seeking
+            if source.tell() != resume_frame:
+                source.seek(resume_frame)
+        # Re-raise encode and write errors so the export fails instead of writing a CSV for missing frames
+        for write in writes:
+            write.result()
+    return [timestamps[frame_number] for frame_number in (first_frame, last_frame) if frame_number in timestamps]
+
+def display_frame_info(img, current_frame, first_frame, last_frame, accident_occurred, height, width, screen, overlay, saving=False, export_failed=False, labels_only=False):
+    # The display is SCALED, so blit at native resolution and let the renderer scale to the window.
+    # Wrap the BGR pixels as-is, no color conversion or transpose copy
+    frame = pygame.image.frombuffer(img.data, (width, height), "BGR")
+    # With labels_only just the strip under the labels is restored from the frame and redrawn
+    dirty_rect = pygame.Rect(0, 0, width, min(height, overlay.band_height)) if labels_only else screen.get_rect()
+    screen.blit(frame, dirty_rect.topleft, dirty_rect)
+    screen.blit(overlay.render(f'Frame: {current_frame}'), overlay.position(0))
     if first_frame is not None:
-        cv2.putText(resized_img, f'First Frame: {first_frame}', (10, 60), font, 1, (255, 255, 255), 2)
+        screen.blit(overlay.render(f'First Frame: {first_frame}'), overlay.position(1))
     if last_frame is not None:
-        cv2.putText(resized_img, f'Last Frame: {last_frame}', (10, 90), font, 1, (255, 255, 255), 2)
+        screen.blit(overlay.render(f'Last Frame: {last_frame}'), overlay.position(2))
     if accident_occurred:
-        cv2.putText(resized_img, 'Accident Occurred', (10, 120), font, 1, (0, 0, 255), 2)
-    frame = cv2.cvtColor(resized_img, cv2.COLOR_BGR2RGB)
-    frame = pygame.surfarray.make_surface(frame.swapaxes(0, 1))
-    screen.blit(frame, (0, 0))
+        screen.blit(overlay.render('Accident Occurred', (255, 0, 0)), overlay.position(3))
+    if saving:
+        screen.blit(overlay.render('Saving...', (255, 255, 0)), overlay.position(4))
+    elif export_failed:
+        screen.blit(overlay.render('Export failed', (255, 0, 0)), overlay.position(4))
+
+    return dirty_rect
 
 def select_output_folder():
-    root = tk.Tk()
-    root.withdraw()
-    output_folder = filedialog.askdirectory(title="Select Output Folder")
-    root.destroy()
-    return output_folder
-
-def write_csv(event, csv_filename):
-    with open(csv_filename, "a", newline="") as f:
+    # Tk is only needed for this dialog, importing it lazily keeps it off the startup path.
+    # One hidden root for the whole session, creating a Tk interpreter per dialog is slow
+    import tkinter as tk
+    from tkinter import filedialog
+    global tk_root
+    if tk_root is None:
+        tk_root = tk.Tk()
+        tk_root.withdraw()
+    return filedialog.askdirectory(parent=tk_root, title="Select Output Folder")
+
+def destroy_tk_root():
+    global tk_root
+    if tk_root is not None:
+        tk_root.destroy()
+        tk_root = None
+
+def write_csv(rows, csv_filename):
+    with open(csv_filename, "w", newline="") as f:
         writer = csv.writer(f)
-        writer.writerow(event)
+        writer.writerows(rows)
+
+def export_frames(source, first_frame, last_frame, output_folder, csv_filename, accident_occurred):
+    timestamps = save_frames(source, first_frame, last_frame, output_folder, accident_occurred)
+    if len(timestamps) != 2:
+        raise RuntimeError(f"Failed to read frames {first_frame} and {last_frame}")
+    first_frame_ms, last_frame_ms = round(timestamps[0][1], 3), round(timestamps[1][1], 3)
+    time_difference_ms = round(last_frame_ms - first_frame_ms, 3)
+    event_data = (first_frame, first_frame_ms, last_frame, last_frame_ms, time_difference_ms, accident_occurred)
+    # Header and row go out through one open/write instead of a truncate followed by an append
+    write_csv([['First ID', 'Timestamp', 'Last ID', 'Timestamp', 'Time Difference', 'Accident'], event_data], csv_filename)
+
+def export_after(previous_future, *export_args):
+    # Exports of one video run in order, so the CSV always ends up holding the latest marks
+    if previous_future is not None:
+        concurrent.futures.wait([previous_future])
+    export_frames(*export_args)
+
+def report_export_error(future):
+    # A failed export is reported and the session carries on, the marks can be exported again
+    if future.exception() is None:
+        return False
+    print(f"Failed to export frames: {future.exception()}")
+    return True
+
+def release_after_export(future, source):
+    source.release()
+    report_export_error(future)
 
 def process_video(video_path, base_output_folder, video_info_list):
     video_name = os.path.splitext(os.path.basename(video_path))[0]
     output_folder = os.path.join(base_output_folder, video_name)
     os.makedirs(output_folder, exist_ok=True)
 
-    cap, screen, frame_count, width, height = initialize_video(video_path)
+    source, screen, overlay, frame_count, width, height = initialize_video(video_path)
     first_frame, last_frame, accident_occurred = None, None, False
     current_frame, running, fullscreen, paused = 0, True, False, False
+    last_input_ts = 0.0
+    decoder = DecodeWorker(source)
+    requested, shown, img = None, (None, False), None
+    # needs_render redraws the labels only, frame_dirty the whole frame
+    needs_render, frame_dirty = False, True
+    export_futures, export_failed = [], False
+    clock = pygame.time.Clock()
     events = []  # List to store video events
 
     while running:
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
                 running = False
+            elif event.type in (pygame.VIDEORESIZE, pygame.VIDEOEXPOSE):
+                frame_dirty = True
             elif event.type == pygame.MOUSEBUTTONDOWN:
                 if event.button == 4:
                     current_frame = max(0, current_frame - 1)
+                    last_input_ts = time.monotonic()
                 elif event.button == 5:
                     current_frame = min(frame_count - 1, current_frame + 1)
+                    last_input_ts = time.monotonic()
             elif event.type == pygame.KEYDOWN:
                 if event.key == pygame.K_f:
                     first_frame = None if first_frame == current_frame else current_frame
                     last_frame = None if first_frame is None else last_frame
+                    source.pin((first_frame, last_frame))
+                    needs_render = True
                 elif event.key == pygame.K_l:
                     last_frame = None if last_frame == current_frame else current_frame
+                    source.pin((first_frame, last_frame))
+                    needs_render = True
                 elif event.key in (pygame.K_COMMA, pygame.K_PERIOD):
                     current_frame = max(0, min(frame_count - 1, current_frame - 1 if event.key == pygame.K_COMMA else current_frame + 1))
+                    last_input_ts = time.monotonic()
                 elif event.key == pygame.K_e:
                     if first_frame is not None and last_frame is not None:
-                        timestamps = save_frames(first_frame, last_frame, video_path, output_folder, accident_occurred)
-                        first_frame_ms, last_frame_ms = round(timestamps[0][1], 3), round(timestamps[1][1], 3)
-                        time_difference_ms = round(last_frame_ms - first_frame_ms, 3)
-                        event_data = (first_frame, first_frame_ms, last_frame, last_frame_ms, time_difference_ms, accident_occurred)
-
                         csv_filename = os.path.join(output_folder, f"{video_name}_output.csv")
-                        with open(csv_filename, "w", newline="") as f:
-                            writer = csv.writer(f)
-                            writer.writerow(['First ID', 'Timestamp', 'Last ID', 'Timestamp', 'Time Difference', 'Accident'])
-                        write_csv(event_data, csv_filename)
-                        first_frame, last_frame = None, None
+                        previous_future = export_futures[-1] if export_futures else None
+                        export_futures.append(executor.submit(export_after, previous_future, source, first_frame, last_frame, output_folder, csv_filename, accident_occurred))
+                        first_frame, last_frame, export_failed = None, None, False
                         accident_occurred = False
-                        cap.set(cv2.CAP_PROP_POS_FRAMES, current_frame)
-                        success, img = cap.read()
-                        if success:
-                            display_frame_info(img, current_frame, first_frame, last_frame, accident_occurred, height, width, screen)
-                            pygame.display.flip()
+                        needs_render = True
                 elif event.key == pygame.K_a:
                     accident_occurred = not accident_occurred
+                    needs_render = True
                 elif event.key == pygame.K_F11:
                     fullscreen = not fullscreen
-                    screen = pygame.display.set_mode((0, 0), pygame.FULLSCREEN) if fullscreen else pygame.display.set_mode((width, height), pygame.RESIZABLE)
+                    screen = pygame.display.set_mode((width, height), pygame.SCALED | (pygame.FULLSCREEN if fullscreen else pygame.RESIZABLE))
+                    frame_dirty = True
                 elif event.key == pygame.K_n:
                     first_frame, last_frame, events, running = None, None, [], False
                 elif event.key == pygame.K_SPACE:
                     paused = not paused
-                    pygame.time.set_timer(pygame.USEREVENT, 100) if paused else pygame.time.set_timer(pygame.USEREVENT, 0)
 
-        if current_frame < frame_count:
-            cap.set(cv2.CAP_PROP_POS_FRAMES, current_frame)
-            success, img = cap.read()
-            if success:
-                display_frame_info(img, current_frame, first_frame, last_frame, accident_occurred, height, width, screen)
-                pygame.display.flip()
-            current_frame = min(frame_count - 1, current_frame + 1) if not paused else current_frame
+        for future in [future for future in export_futures if future.done()]:
+            export_futures.remove(future)
+            export_failed = report_export_error(future) or export_failed
+            needs_render = True
+            if not export_futures:
+                # The exported frames no longer need to stay decoded, keep only marks made since
+                source.pin((first_frame, last_frame))
 
+        # Request only the latest wanted frame once the event queue is drained,
+        # a keyframe preview while scrubbing and the exact frame once input settles
+        scrubbing = time.monotonic() - last_input_ts < SCRUB_SETTLE_S
+        wanted = (current_frame, not scrubbing)
+        if shown != (current_frame, True) and wanted != requested:
+            # Read-ahead only for exact frames during playback, after a scrub preview it would hold the
+            # container for a decode up from the keyframe and make the next wheel tick wait on it
+            decoder.request(*wanted, prefetch=PLAYBACK_PREFETCH if wanted[1] and not paused else 0)
+            requested = wanted
+        decoded = decoder.latest()
+        if decoded is not None:
+            shown, img = decoded[:2], decoded[2]
+            frame_dirty = True
+        # Overlay-only changes redraw the last decoded frame without touching the decoder
+        if (needs_render or frame_dirty) and img is not None:
+            dirty_rect = display_frame_info(img, current_frame, first_frame, last_frame, accident_occurred, height, width, screen, overlay, saving=bool(export_futures), export_failed=export_failed, labels_only=not frame_dirty)
+            pygame.display.update(dirty_rect)
+            needs_render, frame_dirty = False, False
+        elif requested != shown:
+            # Nothing to draw yet, sleep until the decoder publishes a frame or 5 ms pass
+            decoder.wait(0.005)
+        else:
+            # Paused or at the end of the video, poll input at display rate instead of spinning
+            clock.tick(IDLE_FPS)
+        if not paused and shown == (current_frame, True):
+            current_frame = min(frame_count - 1, current_frame + 1)
+
+    decoder.stop()
     pygame.quit()
-    cap.release()
+    if export_futures:
+        # Don't hold up the next video, the exports finish in the background and the last one closes the container
+        source.drop_cache()
+        for future in export_futures[:-1]:
+            future.add_done_callback(report_export_error)
+        export_futures[-1].add_done_callback(lambda future: release_after_export(future, source))
+    else:
+        source.release()
 
 def main():
     print_usage()
     args = parse_arguments()
     if os.path.isdir(args.input_path):
         video_info_list = []
-        video_files = glob.glob(os.path.join(args.input_path, "*.mp4"))
+        video_files = [e.path for e in os.scandir(args.input_path) if e.is_file() and os.path.splitext(e.name)[1].lower() in VIDEO_EXTS]
         for video_file in video_files:
             process_video(video_file, args.input_path, video_info_list)
     elif os.path.isfile(args.input_path):
@@ -169,6 +591,9 @@ def main():
         process_video(args.input_path, os.path.dirname(args.input_path), video_info_list)
     else:
         sys.exit("Invalid input path. Please provide a valid video file or folder.")
+    # Exports of the last videos may still be running
+    executor.shutdown(wait=True)
+    destroy_tk_root()
 
 if __name__ == "__main__":
     main()